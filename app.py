@@ -1,6 +1,5 @@
 import streamlit as st
 import pandas as pd
-import sqlite3
 import time
 import os
 from datetime import datetime
@@ -9,7 +8,10 @@ from datetime import datetime
 # Ensure engine.py and ingest.py are in the same directory
 try:
     from engine import get_relevant_schema, generate_sql, execute_query, get_final_answer
-    from ingest import ingest_schema
+    from ingest import refresh_table_schema
+    from storage import write_table, get_table_columns
+    from approx import approximate_query, get_column_profile
+    from sql_cache import match_template, store_template, discard_template, invalidate_table, invalidate_values, get_template_stats
 except ImportError as e:
     st.error(f"❌ Import Error: {e}. Please ensure 'engine.py' and 'ingest.py' are in the same directory.")
     st.stop()
@@ -217,7 +219,12 @@ if 'selected_query' not in st.session_state: st.session_state.selected_query = "
 if 'show_results' not in st.session_state: st.session_state.show_results = False
 if 'last_result' not in st.session_state: st.session_state.last_result = None
 if 'last_sql' not in st.session_state: st.session_state.last_sql = None
+if 'last_params' not in st.session_state: st.session_state.last_params = None
+if 'last_bounds' not in st.session_state: st.session_state.last_bounds = None
 if 'last_time' not in st.session_state: st.session_state.last_time = 0
+if 'last_upload' not in st.session_state: st.session_state.last_upload = None
+if 'upload_summary' not in st.session_state: st.session_state.upload_summary = None
+if 'upload_profile' not in st.session_state: st.session_state.upload_profile = None
 
 # --- Header ---
 st.markdown("""
@@ -231,6 +238,16 @@ st.markdown("""
 with st.sidebar:
     st.markdown('<div class="sidebar-header">📁 Data Management</div>', unsafe_allow_html=True)
     
+    upload_mode = st.radio(
+        "Upload mode",
+        ["Replace", "Append", "Upsert"],
+        horizontal=True,
+        help="Replace rewrites the table, Append adds new rows, Upsert updates rows matching the key columns and adds the rest"
+    )
+    key_columns = []
+    if upload_mode == "Upsert":
+        key_columns = st.multiselect("Key columns", get_table_columns('sales'))
+    
     uploaded_file = st.file_uploader(
         "Upload your file here",
         type=["csv", "xlsx"],
@@ -246,26 +263,57 @@ with st.sidebar:
                 else:
                     df_upload = pd.read_excel(uploaded_file)
                 
-                # 2. Save to SQLite (Default table name 'sales' for simplicity)
-                conn = sqlite3.connect('database.db')
-                df_upload.to_sql('sales', conn, if_exists='replace', index=False)
-                conn.close()
+                # Streamlit reruns the script on every interaction, so each file is written once, on request
+                already_written = st.session_state.last_upload == uploaded_file.file_id
                 
-                # 3. Update Vector DB
-                try:
-                    ingest_schema()
-                except Exception as ingest_e:
-                    st.warning(f"⚠️ Ingest Warning: {ingest_e}")
+                if upload_mode == "Upsert" and not key_columns:
+                    st.info("ℹ️ Select key columns to upsert on.")
+                elif st.button("📥 Apply Upload", disabled=already_written, use_container_width=True):
+                    # 2. Save to SQLite (Default table name 'sales' for simplicity)
+                    summary = write_table(df_upload, 'sales', mode=upload_mode.lower(), key_columns=key_columns)
+                    
+                    # Appended rows keep the schema, so cached SQL templates stay valid; only their known values change
+                    if summary['mode'] == 'replace':
+                        invalidate_table('sales')
+                    else:
+                        invalidate_values('sales')
+                    
+                    # 3. Update Vector DB (only the affected table's schema document)
+                    try:
+                        refresh_table_schema('sales')
+                    except Exception as ingest_e:
+                        st.warning(f"⚠️ Ingest Warning: {ingest_e}")
+                    
+                    st.session_state.last_upload = uploaded_file.file_id
+                    st.session_state.upload_summary = summary
+                    st.session_state.upload_profile = get_column_profile('sales')
+                    already_written = True
                 
-                st.success(f"✅ '{uploaded_file.name}' indexed successfully!")
+                if already_written:
+                    summary = st.session_state.upload_summary
+                    st.success(f"✅ '{uploaded_file.name}' indexed successfully!")
+                    st.caption(
+                        f"{summary['mode'].title()} | Inserted: {summary['inserted']} | Updated: {summary['updated']} | "
+                        f"Table Rows: {summary['row_count']}"
+                    )
                 
                 with st.expander("📊 View Data Preview"):
                     st.dataframe(df_upload.head(), use_container_width=True)
                     st.caption(f"Rows: {len(df_upload)} | Columns: {len(df_upload.columns)}")
+                
+                if already_written and st.session_state.upload_profile is not None:
+                    with st.expander("📐 Column Profile (approx.)"):
+                        st.dataframe(st.session_state.upload_profile, use_container_width=True, hide_index=True)
                     
             except Exception as e:
                 st.error(f"❌ Error: {str(e)}")
 
+    approx_mode = st.checkbox(
+        "⚡ Fast approximate answers",
+        value=True,
+        help="On large tables, COUNT/SUM/AVG queries are first answered from a sample with 95% error bounds"
+    )
+
     st.markdown("---")
     st.markdown('<div class="sidebar-header">📊 Metrics</div>', unsafe_allow_html=True)
     col1, col2 = st.columns(2)
@@ -274,6 +322,13 @@ with st.sidebar:
     with col2:
         st.metric("Last Time", f"{st.session_state.last_time:.2f}s")
     
+    template_stats = get_template_stats()
+    col3, col4 = st.columns(2)
+    with col3:
+        st.metric("Template Hit Rate", f"{template_stats['hit_rate']:.0%}")
+    with col4:
+        st.metric("Templates", template_stats['templates'])
+    
     # History
     if st.session_state.query_history:
         st.markdown("---")
@@ -321,6 +376,18 @@ generate_button = st.button("🚀 Generate Query", use_container_width=True)
 st.markdown('</div>', unsafe_allow_html=True)
 
 # --- Logic Processing ---
+def run_query(sql_query, sql_params=None):
+    """
+    Answer from the pre-built sample when possible, otherwise run the exact query.
+    Returns (df, bounds, error); bounds is None for exact results.
+    """
+    if approx_mode:
+        approx_result = approximate_query(sql_query, sql_params)
+        if approx_result is not None:
+            return approx_result[0], approx_result[1], None
+    df, error = execute_query(sql_query, sql_params)
+    return df, None, error
+
 if generate_button and query and not st.session_state.show_results:
     if not os.path.exists('database.db'):
         st.error("⚠️ Database not found! Please upload a file first.")
@@ -328,30 +395,48 @@ if generate_button and query and not st.session_state.show_results:
         with st.spinner("🔍 Analyzing your data..."):
             try:
                 start_time = time.time()
+                df_result, df_bounds, exec_error, sql_params = None, None, None, None
                 
-                # 1. Get Schema
-                schema_context, sources = get_relevant_schema(query)
+                # 0. Reuse a cached SQL template when the question only differs in literals
+                template_hit = match_template(query)
+                if template_hit is not None:
+                    sql_query, sql_params = template_hit
+                    df_result, df_bounds, exec_error = run_query(sql_query, sql_params)
+                    # An empty result is a valid answer; only a failed execution sends the question to the LLM
+                    if exec_error:
+                        discard_template(sql_query)
+                        template_hit, exec_error, sql_params = None, None, None
                 
-                # 2. Generate SQL
-                sql_query, gen_time = generate_sql(query, schema_context)
+                if template_hit is None:
+                    # 1. Get Schema
+                    schema_context, sources = get_relevant_schema(query)
+                    
+                    # 2. Generate SQL
+                    sql_query, gen_time = generate_sql(query, schema_context)
                 
                 if "ERROR" in sql_query:
                     st.error(f"❌ Could not generate SQL: {sql_query}")
                 else:
                     # 3. Execute SQL
-                    df_result, exec_error = execute_query(sql_query)
+                    if template_hit is None:
+                        df_result, df_bounds, exec_error = run_query(sql_query)
                     
                     if exec_error:
                         st.error(f"❌ Execution Error: {exec_error}")
                         with st.expander("Debug SQL"):
                             st.code(sql_query, language="sql")
                     else:
+                        if template_hit is None:
+                            store_template(query, sql_query)
+                        
                         # Removed AI Answer generation to avoid vague responses
                         total_time = time.time() - start_time
                         
                         # Store State
                         st.session_state.last_result = df_result
                         st.session_state.last_sql = sql_query
+                        st.session_state.last_params = sql_params
+                        st.session_state.last_bounds = df_bounds
                         st.session_state.last_time = total_time
                         st.session_state.total_queries += 1
                         st.session_state.query_history.append({'query': query, 'timestamp': datetime.now()})
@@ -364,6 +449,22 @@ if generate_button and query and not st.session_state.show_results:
 # --- Result Display ---
 if st.session_state.show_results and st.session_state.last_result is not None:
     
+    # 0. Approximate answer notice with error bounds
+    if st.session_state.last_bounds is not None:
+        st.info("⚡ Approximate answer from a pre-built sample. Values below are ± the 95% error bound.")
+        st.dataframe(st.session_state.last_bounds, use_container_width=True, hide_index=True)
+        if st.button("🎯 Get Exact Result", use_container_width=True):
+            with st.spinner("🔍 Computing exact result..."):
+                start_time = time.time()
+                df_exact, exec_error = execute_query(st.session_state.last_sql, st.session_state.last_params)
+            if exec_error:
+                st.error(f"❌ Execution Error: {exec_error}")
+            else:
+                st.session_state.last_result = df_exact
+                st.session_state.last_bounds = None
+                st.session_state.last_time = time.time() - start_time
+                st.rerun()
+    
     # 1. Technical Details (Collapsible)
     with st.expander("🔧 View SQL Query & Raw Data", expanded=True):
         col1, col2 = st.columns([1,1])
@@ -381,6 +482,10 @@ if st.session_state.show_results and st.session_state.last_result is not None:
             # Also keep the original code block for copy functionality
             st.code(st.session_state.last_sql, language="sql")
             
+            if st.session_state.last_params is not None:
+                st.markdown(f"**Parameters:** `{st.session_state.last_params}`")
+                st.caption("⚡ Served from SQL template cache (no LLM call)")
+            
         with col2:
             st.markdown(f"**Execution Time:** {st.session_state.last_time:.2f}s")
             st.markdown(f"**Rows Returned:** {len(st.session_state.last_result)}")
@@ -405,6 +510,8 @@ if st.session_state.show_results and st.session_state.last_result is not None:
         st.session_state.show_results = False
         st.session_state.last_result = None
         st.session_state.last_sql = None
+        st.session_state.last_params = None
+        st.session_state.last_bounds = None
         st.rerun()
 
 # --- Footer ---
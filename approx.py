@@ -0,0 +1,632 @@
+import os
+import re
+import sqlite3
+import numpy as np
+import pandas as pd
+
+# Approximate answers for large tables.
+# At ingest each table gets a stratified Bernoulli sample (every sampled row carries
+# _weight = 1 / inclusion probability) and a HyperLogLog sketch per column. Eligible
+# COUNT/SUM/AVG queries are re-run against the sample and return 95% error bounds.
+
+SAMPLE_ROWS = 100_000          # Target sample size per table
+MIN_STRATUM_ROWS = 200         # Small strata are sampled at a higher rate so no group vanishes
+MAX_STRATA = 1000              # Columns with more distinct values are not used for stratifying
+APPROX_MIN_ROWS = 1_000_000    # Smaller tables are answered exactly
+HLL_PRECISION = 12             # 4096 registers, ~1.6% standard error
+MIN_SUPPORT_ROWS = 30          # Fewer sampled rows per group make the error bounds themselves unreliable
+Z_95 = 1.96
+
+SAMPLE_META = "_sample_meta"
+SAMPLE_STRATA = "_sample_strata"
+DISTINCT_SKETCHES = "_distinct_sketches"
+
+_rng = np.random.default_rng()
+
+QUERY_PATTERN = re.compile(
+    r'^\s*SELECT\s+(?P<select>.+?)\s+FROM\s+(?P<table>"[^"]+"|\w+)'
+    r'(?:\s+WHERE\s+(?P<where>.+?))?'
+    r'(?:\s+GROUP\s+BY\s+(?P<group>.+?))?'
+    r'(?:\s+ORDER\s+BY\s+(?P<order>.+?))?'
+    r'(?:\s+LIMIT\s+(?P<limit>\d+))?\s*;?\s*$',
+    re.IGNORECASE | re.DOTALL
+)
+UNSUPPORTED_PATTERN = re.compile(
+    r'\b(?:JOIN|UNION|INTERSECT|EXCEPT|HAVING|OVER|WITH|OFFSET|MIN|MAX)\b|\(\s*SELECT\b|^\s*SELECT\s+DISTINCT\b',
+    re.IGNORECASE
+)
+AGGREGATE_PATTERN = re.compile(r'^(COUNT|SUM|AVG)\s*\(\s*(DISTINCT\s+)?(.*?)\s*\)$', re.IGNORECASE | re.DOTALL)
+IDENTIFIER_PATTERN = re.compile(r'^(?:"[^"]+"|\w+)$')
+
+def sample_table(table_name):
+    return f"_sample_{table_name}"
+
+def ensure_approx_tables(conn):
+    """
+    Create the sample bookkeeping and sketch tables if they do not exist yet.
+    """
+    conn.execute(f"""CREATE TABLE IF NOT EXISTS {SAMPLE_META} (
+        table_name TEXT PRIMARY KEY,
+        stratum_column TEXT,
+        base_rate REAL NOT NULL
+    )""")
+    conn.execute(f"""CREATE TABLE IF NOT EXISTS {SAMPLE_STRATA} (
+        table_name TEXT NOT NULL,
+        stratum TEXT NOT NULL,
+        rate REAL NOT NULL,
+        PRIMARY KEY (table_name, stratum)
+    )""")
+    conn.execute(f"""CREATE TABLE IF NOT EXISTS {DISTINCT_SKETCHES} (
+        table_name TEXT NOT NULL,
+        column_name TEXT NOT NULL,
+        registers BLOB NOT NULL,
+        PRIMARY KEY (table_name, column_name)
+    )""")
+
+# --- HyperLogLog distinct-count sketch ---
+
+def _bit_length(values):
+    """
+    Vectorised bit length of uint64 values.
+    """
+    length = np.zeros(len(values), dtype=np.int64)
+    remaining = values.copy()
+    for shift in (32, 16, 8, 4, 2, 1):
+        mask = remaining >= (np.uint64(1) << np.uint64(shift))
+        length[mask] += shift
+        remaining[mask] >>= np.uint64(shift)
+    return length + (remaining > 0)
+
+def _sketch_values(values):
+    """
+    Text form of values for hashing. Integral floats are written as ints, because one NaN in an
+    appended file turns an int column into float64 and 5.0 must hash like 5.
+    """
+    if pd.api.types.is_float_dtype(values):
+        numbers = values.to_numpy(dtype=float)
+        integral = (numbers == np.floor(numbers)) & (np.abs(numbers) < 2 ** 63)
+        text = values.astype(str).to_numpy(dtype=object)
+        text[integral] = numbers[integral].astype(np.int64).astype(str)
+        return pd.Series(text, index=values.index)
+    return values.astype(str)
+
+def _hll_registers(series):
+    registers = np.zeros(1 << HLL_PRECISION, dtype=np.uint8)
+    values = series.dropna()
+    if values.empty:
+        return registers
+
+    hashes = pd.util.hash_pandas_object(_sketch_values(values), index=False).to_numpy(dtype=np.uint64)
+    index = (hashes >> np.uint64(64 - HLL_PRECISION)).astype(np.int64)
+    rest = hashes << np.uint64(HLL_PRECISION)
+    rank = np.minimum(64 - _bit_length(rest) + 1, 64 - HLL_PRECISION + 1).astype(np.uint8)
+    np.maximum.at(registers, index, rank)
+    return registers
+
+def _hll_estimate(registers):
+    m = len(registers)
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.sum(np.power(2.0, -registers.astype(float)))
+    zeros = int(np.count_nonzero(registers == 0))
+    if raw <= 2.5 * m and zeros:
+        # Linear counting is more accurate for small cardinalities
+        return m * np.log(m / zeros)
+    return raw
+
+def _update_sketches(conn, table_name, df):
+    """
+    Merge the DataFrame's values into each column's stored sketch.
+    Upserted-away values cannot be removed, so distinct counts may drift high until the next replace.
+    """
+    for col in df.columns:
+        registers = _hll_registers(df[col])
+        row = conn.execute(
+            f"SELECT registers FROM {DISTINCT_SKETCHES} WHERE table_name = ? AND column_name = ?",
+            (table_name, col)
+        ).fetchone()
+        if row is not None:
+            registers = np.maximum(registers, np.frombuffer(row[0], dtype=np.uint8))
+        conn.execute(
+            f"INSERT OR REPLACE INTO {DISTINCT_SKETCHES} (table_name, column_name, registers) VALUES (?, ?, ?)",
+            (table_name, col, registers.tobytes())
+        )
+
+# --- Stratified samples ---
+
+def _choose_stratum_column(df):
+    """
+    Pick the lowest-cardinality text column, so GROUP BY on it keeps every group in the sample.
+    """
+    best = None
+    for col in df.columns:
+        if pd.api.types.is_numeric_dtype(df[col]):
+            continue
+        distinct = df[col].nunique(dropna=False)
+        if 2 <= distinct <= MAX_STRATA and (best is None or distinct < best[1]):
+            best = (col, distinct)
+    return best[0] if best else None
+
+def _stratum_keys(df, column):
+    if column is None:
+        return pd.Series("", index=df.index)
+    return df[column].astype(str)
+
+def _stratum_rates(keys, base_rate):
+    return {
+        key: min(1.0, max(base_rate, MIN_STRATUM_ROWS / count))
+        for key, count in keys.value_counts().items()
+    }
+
+def _draw_sample(df, keys, rates):
+    row_rates = keys.map(rates).to_numpy(dtype=float)
+    keep = _rng.random(len(df)) < row_rates
+    sample = df[keep].copy()
+    sample["_weight"] = 1.0 / row_rates[keep]
+    return sample
+
+def _save_strata(conn, table_name, rates):
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {SAMPLE_STRATA} (table_name, stratum, rate) VALUES (?, ?, ?)",
+        [(table_name, key, float(rate)) for key, rate in rates.items()]
+    )
+
+def _has_sample(conn, table_name):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name = ?", (sample_table(table_name),)
+    ).fetchone() is not None
+
+def build_approx(conn, table_name, df):
+    """
+    Build the sketches and stratum rates for a freshly (re)written table. The sample itself is only
+    materialised for tables large enough to be answered approximately; below that it would just be
+    a second copy of the table.
+    """
+    ensure_approx_tables(conn)
+    for meta_table in (SAMPLE_META, SAMPLE_STRATA, DISTINCT_SKETCHES):
+        conn.execute(f"DELETE FROM {meta_table} WHERE table_name = ?", (table_name,))
+
+    base_rate = min(1.0, SAMPLE_ROWS / max(len(df), 1))
+    stratum_column = _choose_stratum_column(df)
+    keys = _stratum_keys(df, stratum_column)
+    rates = _stratum_rates(keys, base_rate)
+
+    conn.execute(f'DROP TABLE IF EXISTS "{sample_table(table_name)}"')
+    if len(df) >= APPROX_MIN_ROWS:
+        _draw_sample(df, keys, rates).to_sql(sample_table(table_name), conn, if_exists='replace', index=False)
+    conn.execute(
+        f"INSERT INTO {SAMPLE_META} (table_name, stratum_column, base_rate) VALUES (?, ?, ?)",
+        (table_name, stratum_column, base_rate)
+    )
+    _save_strata(conn, table_name, rates)
+    _update_sketches(conn, table_name, df)
+
+def _load_meta(conn, table_name):
+    ensure_approx_tables(conn)
+    return conn.execute(
+        f"SELECT stratum_column, base_rate FROM {SAMPLE_META} WHERE table_name = ?", (table_name,)
+    ).fetchone()
+
+def remove_sample_rows(conn, table_name, staging_table, key_columns):
+    """
+    Drop sampled rows that an upsert is about to replace.
+    """
+    if _load_meta(conn, table_name) is None or not _has_sample(conn, table_name):
+        return
+    sample = sample_table(table_name)
+    join_on = " AND ".join(f's."{k}" IS t."{k}"' for k in key_columns)
+    conn.execute(
+        f'DELETE FROM "{sample}" WHERE rowid IN (SELECT t.rowid FROM {staging_table} s JOIN "{sample}" t ON {join_on})'
+    )
+
+def extend_approx(conn, table_name, df, row_count):
+    """
+    Sample appended rows at their stratum's existing rate and merge them into the sketches.
+    row_count is the table size after the append. Tables ingested before samples existed are
+    left exact-only.
+    """
+    meta = _load_meta(conn, table_name)
+    if meta is None:
+        return
+    stratum_column, base_rate = meta
+    _update_sketches(conn, table_name, df)
+
+    if not _has_sample(conn, table_name):
+        if row_count >= APPROX_MIN_ROWS:
+            _sample_in_sql(conn, table_name, stratum_column, row_count)
+        return
+
+    rates = dict(conn.execute(
+        f"SELECT stratum, rate FROM {SAMPLE_STRATA} WHERE table_name = ?", (table_name,)
+    ).fetchall())
+    keys = _stratum_keys(df, stratum_column)
+    new_rates = {k: r for k, r in _stratum_rates(keys, base_rate).items() if k not in rates}
+    _save_strata(conn, table_name, new_rates)
+    rates.update(new_rates)
+
+    _draw_sample(df, keys, rates).to_sql(sample_table(table_name), conn, if_exists='append', index=False)
+    _thin_sample(conn, table_name, stratum_column, base_rate, rates)
+
+def _sample_in_sql(conn, table_name, stratum_column, row_count):
+    """
+    Draw the first sample once appends grow a table past APPROX_MIN_ROWS. Sampling runs inside
+    SQLite so the table is never loaded into pandas.
+    """
+    base_rate = min(1.0, SAMPLE_ROWS / row_count)
+    # Same keys as _stratum_keys: pandas writes missing text values as 'nan'
+    key_sql = f"""COALESCE(CAST("{stratum_column}" AS TEXT), 'nan')""" if stratum_column else "''"
+    counts = conn.execute(f'SELECT {key_sql}, COUNT(*) FROM "{table_name}" GROUP BY 1').fetchall()
+    rates = {key: min(1.0, max(base_rate, MIN_STRATUM_ROWS / count)) for key, count in counts}
+
+    rate_sql = f"(CASE {key_sql} {' '.join('WHEN ? THEN ?' for _ in rates)} END)"
+    args = [value for item in rates.items() for value in item]
+    # random() is uniform over signed 64-bit integers; shift it onto [0, 1)
+    conn.execute(
+        f'CREATE TABLE "{sample_table(table_name)}" AS SELECT *, 1.0 / {rate_sql} AS "_weight" '
+        f'FROM "{table_name}" WHERE random() / 18446744073709551616.0 + 0.5 < {rate_sql}',
+        args + args
+    )
+    conn.execute(f"DELETE FROM {SAMPLE_STRATA} WHERE table_name = ?", (table_name,))
+    _save_strata(conn, table_name, rates)
+    conn.execute(f"UPDATE {SAMPLE_META} SET base_rate = ? WHERE table_name = ?", (base_rate, table_name))
+
+def _thin_sample(conn, table_name, stratum_column, base_rate, rates):
+    """
+    Subsample the sample once appends have grown it past twice the target size.
+    Thinning a Bernoulli sample is again a Bernoulli sample, so weights stay exact.
+    """
+    sample_name = sample_table(table_name)
+    count = conn.execute(f'SELECT COUNT(*) FROM "{sample_name}"').fetchone()[0]
+    if count <= 2 * SAMPLE_ROWS:
+        return
+
+    sample = pd.read_sql_query(f'SELECT * FROM "{sample_name}"', conn)
+    keys = _stratum_keys(sample, stratum_column)
+    factor = SAMPLE_ROWS / count
+    population = sample["_weight"].groupby(keys).sum()
+    new_rates = {
+        key: min(rate, max(rate * factor, min(1.0, MIN_STRATUM_ROWS / population.get(key, 1.0))))
+        for key, rate in rates.items()
+    }
+
+    keep_prob = keys.map({key: new_rates[key] / rates[key] for key in rates}).to_numpy(dtype=float)
+    keep = _rng.random(len(sample)) < keep_prob
+    sample = sample[keep].copy()
+    sample["_weight"] = sample["_weight"] / keep_prob[keep]
+
+    sample.to_sql(sample_name, conn, if_exists='replace', index=False)
+    _save_strata(conn, table_name, new_rates)
+    conn.execute(f"UPDATE {SAMPLE_META} SET base_rate = ? WHERE table_name = ?", (base_rate * factor, table_name))
+
+# --- Query rewriting ---
+
+def _split_top_level(text):
+    """
+    Split on commas that are not inside parentheses or quotes.
+    """
+    parts, depth, quote, current = [], 0, None, []
+    for char in text:
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append("".join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    parts.append("".join(current).strip())
+    return parts
+
+def _balanced(text):
+    """
+    True if every parenthesis outside quotes is closed in order.
+    """
+    depth, quote = 0, None
+    for char in text:
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth < 0:
+                return False
+    return depth == 0 and quote is None
+
+def _norm(expr):
+    return " ".join(expr.replace('"', '').split()).lower()
+
+def _unquote(name):
+    return name[1:-1] if name.startswith('"') else name
+
+def _split_alias(item):
+    """
+    Return (expression, output column name) for a SELECT item, as SQLite would name it.
+    """
+    explicit = re.match(r'^(.*?)\s+AS\s+("[^"]+"|\w+)$', item, re.IGNORECASE | re.DOTALL)
+    if explicit:
+        return explicit.group(1).strip(), _unquote(explicit.group(2))
+    implicit = re.match(r'^(.*\))\s+("[^"]+"|\w+)$', item, re.DOTALL)
+    if implicit:
+        return implicit.group(1).strip(), _unquote(implicit.group(2))
+    return item, item
+
+def _plan(sql_query, params):
+    """
+    Parse an eligible aggregate query. Returns a plan dict or None.
+    """
+    match = QUERY_PATTERN.match(sql_query)
+    if not match or UNSUPPORTED_PATTERN.search(sql_query):
+        return None
+
+    # Bound parameters are only supported in WHERE, where their order is preserved
+    outside_where = sql_query.replace(match.group("where") or "", "")
+    if params and "?" in outside_where:
+        return None
+
+    items = [_split_alias(item) for item in _split_top_level(match.group("select"))]
+    group_exprs = _split_top_level(match.group("group")) if match.group("group") else []
+    group_exprs = [items[int(g) - 1][0] if g.isdigit() and int(g) <= len(items) else g for g in group_exprs]
+    group_norms = [_norm(g) for g in group_exprs]
+
+    outputs, aggregates, distinct = [], [], None
+    for expr, name in items:
+        agg = AGGREGATE_PATTERN.match(expr)
+        # SUM(a)/COUNT(*) also fits the pattern, but its "argument" is not balanced
+        if agg and not _balanced(agg.group(3)):
+            return None
+        if agg:
+            func, is_distinct, arg = agg.group(1).upper(), bool(agg.group(2)), agg.group(3)
+            if is_distinct:
+                if func != "COUNT" or not IDENTIFIER_PATTERN.match(arg):
+                    return None
+                distinct = _unquote(arg)
+            aggregates.append({"name": name, "func": func, "arg": None if arg == "*" else arg})
+            outputs.append(("agg", name, len(aggregates) - 1))
+        elif _norm(expr) in group_norms:
+            outputs.append(("group", name, group_norms.index(_norm(expr))))
+        else:
+            return None
+
+    if not aggregates:
+        return None
+    # COUNT(DISTINCT ...) is answered from the sketch, which only covers the whole column
+    if distinct is not None and (len(items) > 1 or match.group("where") or group_exprs):
+        return None
+
+    order = []
+    if match.group("order"):
+        for item in _split_top_level(match.group("order")):
+            direction = re.match(r'^(.*?)(?:\s+(ASC|DESC))?$', item, re.IGNORECASE | re.DOTALL)
+            expr, ascending = direction.group(1).strip(), (direction.group(2) or "ASC").upper() == "ASC"
+            target = None
+            for position, (select_expr, name) in enumerate(items, 1):
+                if _norm(expr) in (_norm(select_expr), _norm(name)) or expr == str(position):
+                    target = name
+            if target is None:
+                return None
+            order.append((target, ascending))
+
+
+    return {
+        "table": _unquote(match.group("table")),
+        "table_token": match.group("table"),
+        "where": match.group("where"),
+        "group_exprs": group_exprs,
+        "outputs": outputs,
+        "aggregates": aggregates,
+        "distinct": distinct,
+        "order": order,
+        "order_by_aggregate": any(name in {agg["name"] for agg in aggregates} for name, _ in order),
+        "limit": int(match.group("limit")) if match.group("limit") else None
+    }
+
+def _estimate(frame, group_count, aggregates):
+    """
+    Horvitz-Thompson estimates with 95% half-widths, one row per group.
+    Var(sum) = sum((w^2 - w) * y^2); AVG uses the linearised ratio-estimator variance.
+    """
+    weight = frame["_weight"].astype(float)
+    var_factor = weight * weight - weight
+    group_cols = [f"_g{i}" for i in range(group_count)]
+    if group_cols:
+        # SQL GROUP BY keeps NULL as its own group
+        group_id = frame.groupby(group_cols, dropna=False, sort=False).ngroup()
+        groups = frame.groupby(group_id)[group_cols].first()
+    else:
+        group_id = pd.Series(0, index=frame.index)
+        groups = pd.DataFrame(index=[0])
+
+    estimates, bounds = {}, {}
+    for i, agg in enumerate(aggregates):
+        if agg["arg"] is None:
+            present = pd.Series(1.0, index=frame.index)
+            value = present
+        else:
+            raw = frame[f"_a{i}"]
+            present = raw.notna().astype(float)
+            value = present if agg["func"] == "COUNT" else pd.to_numeric(raw, errors="coerce").fillna(0.0)
+
+        total = (weight * value).groupby(group_id).sum().reindex(groups.index, fill_value=0.0)
+        if agg["func"] == "AVG":
+            count = (weight * present).groupby(group_id).sum().reindex(groups.index, fill_value=0.0)
+            ratio = total / count.replace(0.0, np.nan)
+            residual = value - ratio.reindex(group_id.to_numpy()).to_numpy() * present
+            variance = (var_factor * residual * residual).groupby(group_id).sum().reindex(groups.index) / count ** 2
+            estimates[i] = ratio
+        else:
+            variance = (var_factor * value * value).groupby(group_id).sum().reindex(groups.index, fill_value=0.0)
+            estimates[i] = total.round() if agg["func"] == "COUNT" else total
+        bounds[i] = Z_95 * np.sqrt(variance)
+    return groups, estimates, bounds
+
+def _from_table_stats(conn, plan, row_count):
+    """
+    Whole-table COUNT/SUM/AVG over plain columns are exact from the maintained column stats.
+    """
+    result = {}
+    for agg in plan["aggregates"]:
+        if agg["arg"] is None:
+            result[agg["name"]] = row_count
+            continue
+        if not IDENTIFIER_PATTERN.match(agg["arg"]):
+            return None
+        stats = conn.execute(
+            "SELECT non_null, total FROM _column_stats WHERE table_name = ? AND column_name = ?",
+            (plan["table"], _unquote(agg["arg"]))
+        ).fetchone()
+        if stats is None or (agg["func"] != "COUNT" and stats[1] is None):
+            return None
+        non_null, total = stats
+        if agg["func"] == "COUNT":
+            result[agg["name"]] = non_null
+        elif agg["func"] == "SUM":
+            result[agg["name"]] = total if non_null else None
+        else:
+            result[agg["name"]] = total / non_null if non_null else None
+    df = pd.DataFrame({name: [value] for name, value in result.items()})
+    return df, pd.DataFrame({name: [0.0] for name in result})
+
+def approximate_query(sql_query, params=None, db_path='database.db'):
+    """
+    Answer an aggregate query from the pre-built sample/sketches (or exactly from the
+    maintained table stats when it covers the whole table).
+    Returns (df, bounds) where bounds holds the group columns and the ±95% half-width of each
+    aggregate column, or None when the query is not eligible (small table, unsupported SQL,
+    no sample, too few sampled rows in some group).
+    """
+    plan = _plan(sql_query, params)
+    if plan is None or not os.path.exists(db_path):
+        return None
+
+    conn = sqlite3.connect(db_path)
+    try:
+        # Row counts are maintained by ingest.write_table, so eligibility needs no table scan
+        stats = conn.execute(
+            "SELECT row_count FROM _table_stats WHERE table_name = ?", (plan["table"],)
+        ).fetchone()
+        if stats is None or stats[0] < APPROX_MIN_ROWS or not _has_sample(conn, plan["table"]):
+            return None
+
+        if not plan["where"] and not plan["group_exprs"] and plan["distinct"] is None:
+            exact = _from_table_stats(conn, plan, stats[0])
+            if exact is not None:
+                return exact
+
+        if plan["distinct"] is not None:
+            row = conn.execute(
+                f"SELECT registers FROM {DISTINCT_SKETCHES} WHERE table_name = ? AND column_name = ?",
+                (plan["table"], plan["distinct"])
+            ).fetchone()
+            if row is None:
+                return None
+            estimate = round(_hll_estimate(np.frombuffer(row[0], dtype=np.uint8)))
+            half_width = Z_95 * 1.04 / np.sqrt(1 << HLL_PRECISION) * estimate
+            name = plan["aggregates"][0]["name"]
+            return pd.DataFrame({name: [estimate]}), pd.DataFrame({name: [half_width]})
+
+        columns = [f'{expr} AS "_g{i}"' for i, expr in enumerate(plan["group_exprs"])]
+        columns += [f'{agg["arg"]} AS "_a{i}"' for i, agg in enumerate(plan["aggregates"]) if agg["arg"] is not None]
+        columns.append('"_weight"')
+        sample_sql = f'SELECT {", ".join(columns)} FROM "{sample_table(plan["table"])}" AS {plan["table_token"]}'
+        if plan["where"]:
+            sample_sql += f' WHERE {plan["where"]}'
+        frame = pd.read_sql_query(sample_sql, conn, params=params)
+    except (sqlite3.Error, pd.errors.DatabaseError) as e:
+        # e.g. a column the LLM invented; the exact query reports it properly
+        print(f"Approximate query fell back to exact: {e}")
+        return None
+    finally:
+        conn.close()
+
+    # A selective WHERE or a group outside the stratum column can leave only a handful of sampled rows
+    group_cols = [f"_g{i}" for i in range(len(plan["group_exprs"]))]
+    support = frame.groupby(group_cols, dropna=False).size() if group_cols else pd.Series([len(frame)])
+    if frame.empty or support.min() < MIN_SUPPORT_ROWS:
+        return None
+
+    groups, estimates, bounds = _estimate(frame, len(plan["group_exprs"]), plan["aggregates"])
+    # When LIMIT cuts a ranking by an aggregate, sampling noise would decide which groups make
+    # the top N; only serve it if every group fits under the limit
+    if plan["order_by_aggregate"] and plan["limit"] is not None and len(groups) >= plan["limit"]:
+        return None
+    result, errors = pd.DataFrame(index=groups.index), pd.DataFrame(index=groups.index)
+    for kind, name, position in plan["outputs"]:
+        if kind == "group":
+            result[name] = groups[f"_g{position}"]
+            errors[name] = groups[f"_g{position}"]
+        else:
+            result[name] = estimates[position]
+            errors[name] = bounds[position]
+
+    # SQLite returns groups in key order (NULL first); ORDER BY then re-sorts stably
+    ordered = groups.index
+    if len(groups.columns):
+        ordered = groups.sort_values(by=list(groups.columns), na_position='first', kind='mergesort').index
+    result, errors = result.loc[ordered], errors.loc[ordered]
+    if plan["order"]:
+        ordered = result.sort_values(
+            by=[name for name, _ in plan["order"]],
+            ascending=[ascending for _, ascending in plan["order"]],
+            kind='mergesort'
+        ).index
+        result, errors = result.loc[ordered], errors.loc[ordered]
+    if plan["limit"] is not None:
+        result, errors = result.head(plan["limit"]), errors.head(plan["limit"])
+    return result.reset_index(drop=True), errors.reset_index(drop=True)
+
+def get_column_profile(table_name, db_path='database.db'):
+    """
+    Approximate distinct counts and quartiles per column, read from the sketches and sample.
+    Tables too small to keep a sample are read through a uniform SQL sample of up to SAMPLE_ROWS.
+    Returns a DataFrame or None if the table has no sketches.
+    """
+    if not os.path.exists(db_path):
+        return None
+    conn = sqlite3.connect(db_path)
+    try:
+        if _load_meta(conn, table_name) is None:
+            return None
+        if _has_sample(conn, table_name):
+            sample = pd.read_sql_query(f'SELECT * FROM "{sample_table(table_name)}"', conn)
+        else:
+            stats = conn.execute(
+                "SELECT row_count FROM _table_stats WHERE table_name = ?", (table_name,)
+            ).fetchone()
+            rate = min(1.0, SAMPLE_ROWS / stats[0]) if stats and stats[0] else 1.0
+            sample = pd.read_sql_query(
+                f'SELECT *, 1.0 / ? AS "_weight" FROM "{table_name}" '
+                f'WHERE random() / 18446744073709551616.0 + 0.5 < ?',
+                conn, params=(rate, rate)
+            )
+        sketches = dict(conn.execute(
+            f"SELECT column_name, registers FROM {DISTINCT_SKETCHES} WHERE table_name = ?", (table_name,)
+        ).fetchall())
+    finally:
+        conn.close()
+
+    rows = []
+    for col in sample.columns.drop("_weight"):
+        row = {"Column": col, "Distinct (≈)": None, "P25": None, "Median": None, "P75": None}
+        if col in sketches:
+            row["Distinct (≈)"] = round(_hll_estimate(np.frombuffer(sketches[col], dtype=np.uint8)))
+        values = pd.to_numeric(sample[col], errors="coerce")
+        present = values.notna()
+        if pd.api.types.is_numeric_dtype(sample[col]) and present.any():
+            # Weighted quantiles: each sampled row stands for _weight rows of the table
+            order = np.argsort(values[present].to_numpy())
+            sorted_values = values[present].to_numpy()[order]
+            cumulative = np.cumsum(sample["_weight"][present].to_numpy()[order])
+            for label, q in (("P25", 0.25), ("Median", 0.5), ("P75", 0.75)):
+                index = min(np.searchsorted(cumulative, q * cumulative[-1]), len(sorted_values) - 1)
+                row[label] = sorted_values[index]
+        rows.append(row)
+    return pd.DataFrame(rows)
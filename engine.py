@@ -29,7 +29,7 @@ def get_relevant_schema(query):
             # Fallback: Get all tables from database
             conn = sqlite3.connect('database.db')
             cursor = conn.cursor()
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE '\\_%' ESCAPE '\\';")
             tables = cursor.fetchall()
             conn.close()
             
@@ -107,9 +107,10 @@ Instructions:
         print(f"Error in generate_sql: {e}")
         return f"ERROR: {str(e)}", 0
 
-def execute_query(sql_query):
+def execute_query(sql_query, params=None):
     """
     Execute SQL query against SQLite database.
+    params binds "?" placeholders when running a cached SQL template.
     FIX: Better error handling and validation
     """
     try:
@@ -129,7 +130,7 @@ def execute_query(sql_query):
         
         try:
             # FIX: Correct pandas function name
-            df = pd.read_sql_query(sql_query, conn)
+            df = pd.read_sql_query(sql_query, conn, params=params)
             conn.close()
             
             if df.empty:
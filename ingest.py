@@ -5,12 +5,95 @@ import shutil
 from langchain_community.vectorstores import Chroma
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_core.documents import Document
+from storage import ensure_stats_tables, _load_stats
+
+# Internal bookkeeping tables start with "_" and are never indexed or exposed to the LLM
+USER_TABLES_SQL = "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE '\\_%' ESCAPE '\\';"
+
+_vector_db = None
+
+def get_vector_db():
+    """
+    Lazily open the persisted Chroma store used for schema documents.
+    """
+    global _vector_db
+    if _vector_db is None:
+        embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+        _vector_db = Chroma(persist_directory="./chroma_db", embedding_function=embeddings)
+    return _vector_db
+
+def build_schema_document(cursor, table_name):
+    """
+    Build the schema Document for one table, using maintained row counts when available.
+    Returns None if the table has no columns.
+    """
+    cursor.execute(f'PRAGMA table_info("{table_name}")')
+    columns = cursor.fetchall()
+
+    if not columns:
+        return None
+
+    # Format: column_name (type)
+    column_info = []
+    for col in columns:
+        col_name = col[1]
+        col_type = col[2]
+        column_info.append(f"{col_name} ({col_type})")
+
+    ensure_stats_tables(cursor.connection)
+    row_count, _ = _load_stats(cursor.connection, table_name)
+    if row_count is None:
+        cursor.execute(f'SELECT COUNT(*) FROM "{table_name}"')
+        row_count = cursor.fetchone()[0]
+
+    # Create detailed schema document
+    schema_doc = f"""Table Name: {table_name}
+
+Columns:
+{chr(10).join(['- ' + col for col in column_info])}
+
+Row Count: {row_count}
+
+Sample Data Available: Yes"""
+
+    # Create document with metadata
+    return Document(
+        page_content=schema_doc,
+        metadata={
+            "table": table_name,
+            "source": "database.db",
+            "columns": [col[1] for col in columns],
+            "row_count": row_count
+        }
+    )
+
+def refresh_table_schema(table_name):
+    """
+    Re-index the schema document of a single table, leaving other tables' documents untouched.
+    """
+    try:
+        conn = sqlite3.connect('database.db')
+        doc = build_schema_document(conn.cursor(), table_name)
+        conn.commit()
+        conn.close()
+
+        vector_db = get_vector_db()
+        stale_ids = vector_db.get(where={"table": table_name})["ids"]
+        if stale_ids:
+            vector_db.delete(ids=stale_ids)
+        if doc is not None:
+            vector_db.add_documents([doc], ids=[table_name])
+        print(f"✅ Re-indexed table: {table_name}")
+
+    except Exception as e:
+        print(f"❌ Error in refresh_table_schema: {e}")
 
 def ingest_schema():
     """
     Ingest database schema into vector store for RAG retrieval.
     FIX: Better error handling and detailed schema information
     """
+    global _vector_db
     try:
         # Check if database exists
         if not os.path.exists('database.db'):
@@ -26,7 +109,7 @@ def ingest_schema():
         cursor = conn.cursor()
         
         # Get all tables
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
+        cursor.execute(USER_TABLES_SQL)
         tables = cursor.fetchall()
         
         if not tables:
@@ -40,55 +123,17 @@ def ingest_schema():
             table_name = table_name_tuple[0]
             
             try:
-                # Get column information
-                cursor.execute(f"PRAGMA table_info({table_name})")
-                columns = cursor.fetchall()
-                
-                if not columns:
+                doc = build_schema_document(cursor, table_name)
+                if doc is None:
                     continue
-                
-                # Format: column_name (type)
-                column_info = []
-                for col in columns:
-                    col_name = col[1]
-                    col_type = col[2]
-                    column_info.append(f"{col_name} ({col_type})")
-                
-                # Get sample data
-                cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-                row_count = cursor.fetchone()[0]
-                
-                # Get first few rows to understand data
-                cursor.execute(f"SELECT * FROM {table_name} LIMIT 3")
-                sample_rows = cursor.fetchall()
-                
-                # Create detailed schema document
-                schema_doc = f"""Table Name: {table_name}
-
-Columns:
-{chr(10).join(['- ' + col for col in column_info])}
-
-Row Count: {row_count}
-
-Sample Data Available: Yes"""
-                
-                # Create document with metadata
-                doc = Document(
-                    page_content=schema_doc,
-                    metadata={
-                        "table": table_name,
-                        "source": "database.db",
-                        "columns": [col[1] for col in columns],
-                        "row_count": row_count
-                    }
-                )
                 documents.append(doc)
-                print(f"✅ Indexed table: {table_name} ({len(column_info)} columns, {row_count} rows)")
+                print(f"✅ Indexed table: {table_name} ({len(doc.metadata['columns'])} columns, {doc.metadata['row_count']} rows)")
             
             except Exception as e:
                 print(f"⚠️ Error indexing table {table_name}: {e}")
                 continue
         
+        conn.commit()
         conn.close()
         
         if not documents:
@@ -97,9 +142,10 @@ Sample Data Available: Yes"""
         
         # Create vector database
         embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-        vector_db = Chroma.from_documents(
+        _vector_db = Chroma.from_documents(
             documents=documents,
             embedding=embeddings,
+            ids=[doc.metadata["table"] for doc in documents],
             persist_directory="./chroma_db"
         )
         
@@ -0,0 +1,313 @@
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# Questions that differ only in literals ("price > 100" vs "price > 250") share one template.
+# The template key is the question with its literals masked out; the SQL keeps those
+# literals as "?" parameters, so a later match is bound and executed without an LLM call.
+
+MAX_TEMPLATES = 256
+# Columns with more distinct values than this are not resolved from memory; their slots miss
+MAX_LOOKUP_VALUES = 10_000
+
+# Identifiers are matched first so digits inside quoted column names are never lifted
+SQL_TOKEN_PATTERN = re.compile(
+    r"""(?P<ident>"[^"]*"|`[^`]*`|\[[^\]]*\])"""
+    r"""|(?P<str>'(?:[^']|'')*')"""
+    r"""|(?P<num>(?<![\w.])\d+(?:\.\d+)?(?![\w.]))"""
+)
+NUMBER_SLOT = r"(\d+(?:\.\d+)?)"
+LIMIT_PATTERN = re.compile(r"\bLIMIT\s*$", re.IGNORECASE)
+NUMBER_PATTERN = re.compile(r"^\d+(?:\.\d+)?$")
+# Column compared to a string literal: City = '...', "City" != '...', City IN ('...', ...
+COMPARED_COLUMN_PATTERN = re.compile(r'(?:"([^"]+)"|(\w+))\s*(?:=|==|!=|<>|\bIN\s*\([^()]*)\s*$', re.IGNORECASE)
+FROM_PATTERN = re.compile(r'\bFROM\s+(?:"([^"]+)"|(\w+))', re.IGNORECASE)
+
+_templates = OrderedDict()
+# (db_path, table, column) -> {lowercased value: stored spelling}, or None if the column is too wide
+_values = {}
+_stats = {"hits": 0, "misses": 0, "stored": 0}
+_lock = threading.Lock()
+
+def _normalize(question):
+    return " ".join(question.split())
+
+def _find_word(text, word):
+    """
+    Return all (start, end) spans where word occurs in text as a whole word, ignoring case.
+    """
+    pattern = re.compile(r"(?<![\w.])" + re.escape(word) + r"(?![\w.])", re.IGNORECASE)
+    return [m.span() for m in pattern.finditer(text)]
+
+def _case_of(sql_text, question_text):
+    """
+    Describe how the question's spelling maps to the literal stored in the SQL.
+    """
+    if sql_text == question_text:
+        return "same"
+    for name in ("lower", "upper", "title"):
+        if sql_text == getattr(question_text, name)():
+            return name
+    return None
+
+def _apply_case(value, case):
+    return value if case == "same" else getattr(value, case)()
+
+def _bind_value(text, slot):
+    if slot["kind"] == "num":
+        return float(text) if "." in text else int(text)
+    return slot["prefix"] + _apply_case(text, slot["case"]) + slot["suffix"]
+
+def _compared_column(sql, position):
+    """
+    Return (table, column) for a string literal compared with = / != / IN at position, or None.
+    """
+    column = COMPARED_COLUMN_PATTERN.search(sql[:position])
+    tables = FROM_PATTERN.findall(sql)
+    if not column or len(tables) != 1 or re.search(r"\bJOIN\b", sql, re.IGNORECASE):
+        return None
+    return tables[0][0] or tables[0][1], column.group(1) or column.group(2)
+
+def _build_template(question, sql):
+    """
+    Lift the SQL literals that also appear in the question into parameters.
+    Returns (key, pattern, param_sql, slots, params) or None when the mapping is ambiguous.
+    """
+    candidates = []
+    for match in SQL_TOKEN_PATTERN.finditer(sql):
+        kind = match.lastgroup
+        if kind == "ident":
+            continue
+
+        if kind == "str":
+            literal = match.group()[1:-1].replace("''", "'")
+            core = literal.strip("%")
+            prefix = literal[:len(literal) - len(literal.lstrip("%"))]
+            suffix = literal[len(prefix) + len(core):]
+        else:
+            core, prefix, suffix = match.group(), "", ""
+
+        if not core.strip():
+            continue
+        spans = _find_word(question, core)
+        if not spans:
+            # Constants the user never typed (e.g. LIMIT 100) stay inline
+            continue
+        if len(spans) > 1:
+            return None
+
+        case = "same" if kind == "num" else _case_of(core, question[spans[0][0]:spans[0][1]])
+        if case is None:
+            return None
+
+        # Exact comparisons are case-sensitive, so the stored spelling is looked up at bind time;
+        # one example is not enough to learn the column's case style
+        lookup = None
+        if kind == "str" and not (prefix or suffix):
+            lookup = _compared_column(sql, match.start())
+            if lookup is None:
+                return None
+
+        is_limit = bool(LIMIT_PATTERN.search(sql[:match.start()]))
+        candidates.append((match, core, is_limit,
+                           {"kind": kind, "span": spans[0], "prefix": prefix, "suffix": suffix, "case": case,
+                            "lookup": lookup}))
+
+    # "price > 100 ... LIMIT 100": the row cap is not the user's literal, so it stays inline
+    claimed = {}
+    for _, _, is_limit, slot in candidates:
+        claimed.setdefault(slot["span"], []).append(is_limit)
+    candidates = [
+        c for c in candidates
+        if not (c[2] and len(claimed[c[3]["span"]]) > 1)
+    ]
+
+    slots = []
+    params = []
+    sql_parts = []
+    last = 0
+    for match, core, _, slot in candidates:
+        slots.append(slot)
+        params.append(_bind_value(core, {**slot, "case": "same"}))
+        sql_parts.append(sql[last:match.start()])
+        sql_parts.append("?")
+        last = match.end()
+    sql_parts.append(sql[last:])
+
+    # Build the masked key and matching regex in question order
+    ordered = sorted(range(len(slots)), key=lambda i: slots[i]["span"][0])
+    key_parts, regex_parts = [], []
+    position = 0
+    for group, index in enumerate(ordered):
+        start, end = slots[index]["span"]
+        # Two SQL literals bound to the same (or overlapping) words would be filled with one value
+        if start < position:
+            return None
+        text_between = question[position:start]
+        key_parts.append(text_between.lower())
+        key_parts.append("{" + str(group) + "}")
+        regex_parts.append(re.escape(text_between))
+        if slots[index]["kind"] == "num":
+            regex_parts.append(NUMBER_SLOT)
+        else:
+            # A string slot matches the same number of words as the original literal
+            words = len(question[start:end].split())
+            regex_parts.append(r"(\S+" + r"(?:\s+\S+)" * (words - 1) + ")")
+        slots[index]["group"] = group + 1
+        position = end
+    key_parts.append(question[position:].lower())
+    regex_parts.append(re.escape(question[position:]))
+
+    pattern = re.compile("".join(regex_parts), re.IGNORECASE)
+    return "".join(key_parts), pattern, "".join(sql_parts), slots, params
+
+def _bind(template, question):
+    match = template["pattern"].fullmatch(question)
+    if not match:
+        return None
+    # A number typed where the template had a word ("sales in 2023") is a different question
+    if any(slot["kind"] == "str" and any(NUMBER_PATTERN.match(word) for word in match.group(slot["group"]).split())
+           for slot in template["slots"]):
+        return None
+    return [_bind_value(match.group(slot["group"]), slot) for slot in template["slots"]]
+
+def _column_values(db_path, table, column):
+    """
+    Return the distinct string values of a column keyed by their lowercase form, read once per column.
+    Returns None if the column has too many distinct values or cannot be read.
+    """
+    key = (str(db_path), table, column)
+    with _lock:
+        if key in _values:
+            return _values[key]
+
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(
+            f'SELECT DISTINCT "{column}" FROM "{table}" WHERE "{column}" IS NOT NULL LIMIT ?',
+            (MAX_LOOKUP_VALUES + 1,)
+        ).fetchall()
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+
+    values = None
+    if len(rows) <= MAX_LOOKUP_VALUES:
+        values = {}
+        for (value,) in rows:
+            if isinstance(value, str):
+                values.setdefault(value.lower(), value)
+    with _lock:
+        _values[key] = values
+    return values
+
+def _resolve_params(template, params, db_path):
+    """
+    Replace exact-match string params with the spelling stored in their column.
+    Returns None if any value does not exist there, so the question goes to the LLM instead.
+    """
+    lookups = [(i, slot["lookup"]) for i, slot in enumerate(template["slots"]) if slot.get("lookup")]
+    if not lookups:
+        return params
+    if not os.path.exists(db_path):
+        return None
+
+    resolved = list(params)
+    for i, (table, column) in lookups:
+        values = _column_values(db_path, table, column)
+        if values is None or params[i].lower() not in values:
+            return None
+        resolved[i] = values[params[i].lower()]
+    return resolved
+
+def store_template(question, sql):
+    """
+    Cache a successfully executed query as a parameterised template for its question.
+    Returns True if a template was stored.
+    """
+    question = _normalize(question)
+    built = _build_template(question, sql)
+    if built is None:
+        return False
+
+    key, pattern, param_sql, slots, params = built
+    template = {"pattern": pattern, "sql": param_sql, "slots": slots}
+
+    # Binding the original question must reproduce the original literals
+    if _bind(template, question) != params:
+        return False
+
+    with _lock:
+        _templates[key] = template
+        _templates.move_to_end(key)
+        while len(_templates) > MAX_TEMPLATES:
+            _templates.popitem(last=False)
+        _stats["stored"] += 1
+    return True
+
+def match_template(question, db_path='database.db'):
+    """
+    Find a cached template for the question and bind its literals.
+    Returns (parameterised_sql, params) or None.
+    """
+    question = _normalize(question)
+    found = None
+    with _lock:
+        for key in reversed(_templates):
+            params = _bind(_templates[key], question)
+            if params is not None:
+                found = (key, _templates[key], params)
+                break
+
+    params = _resolve_params(found[1], found[2], db_path) if found else None
+    with _lock:
+        if params is None:
+            _stats["misses"] += 1
+            return None
+        if found[0] in _templates:
+            _templates.move_to_end(found[0])
+        _stats["hits"] += 1
+    return found[1]["sql"], params
+
+def discard_template(param_sql):
+    """
+    Drop a template whose bound execution failed and count the lookup as a miss.
+    """
+    with _lock:
+        for key in [k for k, t in _templates.items() if t["sql"] == param_sql]:
+            del _templates[key]
+        _stats["hits"] -= 1
+        _stats["misses"] += 1
+
+def invalidate_values(table_name):
+    """
+    Forget the cached column values of a table (e.g. after rows were appended or upserted).
+    """
+    with _lock:
+        for key in [k for k in _values if k[1].lower() == table_name.lower()]:
+            del _values[key]
+
+def invalidate_table(table_name):
+    """
+    Drop templates whose SQL references the given table (e.g. after its schema was replaced).
+    """
+    pattern = re.compile(r'(?<![\w])["`\[]?' + re.escape(table_name) + r'["`\]]?(?![\w])', re.IGNORECASE)
+    with _lock:
+        for key in [k for k, t in _templates.items() if pattern.search(t["sql"])]:
+            del _templates[key]
+    invalidate_values(table_name)
+
+def get_template_stats():
+    """
+    Return template cache counters and hit rate.
+    """
+    with _lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            **_stats,
+            "templates": len(_templates),
+            "hit_rate": _stats["hits"] / lookups if lookups else 0.0
+        }
@@ -0,0 +1,199 @@
+import os
+import sqlite3
+import pandas as pd
+from approx import build_approx, extend_approx, remove_sample_rows
+
+# Internal bookkeeping tables start with "_" and are never indexed or exposed to the LLM
+TABLE_STATS = "_table_stats"
+COLUMN_STATS = "_column_stats"
+STAGING_TABLE = "_upsert_staging"
+
+def ensure_stats_tables(conn):
+    """
+    Create the row/column statistics tables if they do not exist yet.
+    """
+    conn.execute(f"""CREATE TABLE IF NOT EXISTS {TABLE_STATS} (
+        table_name TEXT PRIMARY KEY,
+        row_count INTEGER NOT NULL
+    )""")
+    conn.execute(f"""CREATE TABLE IF NOT EXISTS {COLUMN_STATS} (
+        table_name TEXT NOT NULL,
+        column_name TEXT NOT NULL,
+        non_null INTEGER NOT NULL,
+        total REAL,
+        PRIMARY KEY (table_name, column_name)
+    )""")
+
+def get_table_columns(table_name, db_path='database.db'):
+    """
+    Return the column names of an existing table, or an empty list.
+    """
+    if not os.path.exists(db_path):
+        return []
+    conn = sqlite3.connect(db_path)
+    try:
+        return [col[1] for col in conn.execute(f'PRAGMA table_info("{table_name}")').fetchall()]
+    finally:
+        conn.close()
+
+def _frame_stats(df):
+    """
+    Summarise a DataFrame as {column: (non_null, total)}.
+    """
+    stats = {}
+    for col in df.columns:
+        series = df[col].dropna()
+        total = None
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            total = float(series.sum())
+        stats[col] = (len(series), total)
+    return stats
+
+def _scan_stats(conn, table_name):
+    """
+    Summarise an existing table with a single aggregate query, without loading it into pandas.
+    Returns (row_count, column_stats) in the same shape as _frame_stats.
+    """
+    columns = conn.execute(f'PRAGMA table_info("{table_name}")').fetchall()
+    numeric = [any(t in (col[2] or "").upper() for t in ("INT", "REAL", "FLOA", "DOUB", "NUM")) for col in columns]
+    aggregates = ["COUNT(*)"]
+    for col, is_numeric in zip(columns, numeric):
+        name = col[1]
+        total = f'SUM("{name}")' if is_numeric else "NULL"
+        aggregates.append(f'COUNT("{name}"), {total}')
+    row = conn.execute(f'SELECT {", ".join(aggregates)} FROM "{table_name}"').fetchone()
+
+    stats = {}
+    for i, (col, is_numeric) in enumerate(zip(columns, numeric)):
+        non_null, total = row[1 + 2 * i:3 + 2 * i]
+        stats[col[1]] = (non_null, float(total) if is_numeric and non_null else None)
+    return row[0], stats
+
+def _load_stats(conn, table_name):
+    """
+    Read stored statistics for a table. Returns (row_count, column_stats) or (None, {}).
+    """
+    row = conn.execute(f"SELECT row_count FROM {TABLE_STATS} WHERE table_name = ?", (table_name,)).fetchone()
+    if row is None:
+        return None, {}
+    columns = {
+        r[0]: tuple(r[1:])
+        for r in conn.execute(
+            f"SELECT column_name, non_null, total FROM {COLUMN_STATS} WHERE table_name = ?",
+            (table_name,)
+        )
+    }
+    return row[0], columns
+
+def _save_stats(conn, table_name, row_count, column_stats):
+    conn.execute(f"DELETE FROM {COLUMN_STATS} WHERE table_name = ?", (table_name,))
+    conn.execute(
+        f"INSERT OR REPLACE INTO {TABLE_STATS} (table_name, row_count) VALUES (?, ?)",
+        (table_name, int(row_count))
+    )
+    conn.executemany(
+        f"INSERT INTO {COLUMN_STATS} (table_name, column_name, non_null, total) VALUES (?, ?, ?, ?)",
+        [(table_name, col, int(s[0]), s[1]) for col, s in column_stats.items()]
+    )
+
+def _apply_delta_stats(current, added, removed):
+    """
+    Fold added/removed row statistics into the stored column statistics.
+    """
+    merged = {}
+    for col in set(current) | set(added):
+        non_null, total = current.get(col, (0, None))
+        a_count, a_total = added.get(col, (0, None))
+        r_count, r_total = removed.get(col, (0, None))
+
+        non_null = non_null + a_count - r_count
+        if total is not None or a_total is not None:
+            total = (total or 0.0) + (a_total or 0.0) - (r_total or 0.0)
+        merged[col] = (non_null, total)
+    return merged
+
+def write_table(df, table_name='sales', mode='replace', key_columns=None, db_path='database.db'):
+    """
+    Write an uploaded DataFrame into SQLite and maintain statistics incrementally.
+
+    mode:
+        'replace' - drop and recreate the table from df
+        'append'  - insert df as new rows
+        'upsert'  - rows whose key_columns match an existing row replace it, others are inserted
+
+    Returns a summary dict: {"mode", "inserted", "updated", "row_count"}.
+    """
+    if mode not in ('replace', 'append', 'upsert'):
+        raise ValueError(f"Unknown upload mode: {mode}")
+
+    key_columns = list(key_columns or [])
+    conn = sqlite3.connect(db_path)
+    try:
+        ensure_stats_tables(conn)
+        existing_columns = [col[1] for col in conn.execute(f'PRAGMA table_info("{table_name}")').fetchall()]
+
+        # A missing table has nothing to merge into, so every mode starts from scratch
+        if mode == 'replace' or not existing_columns:
+            df.to_sql(table_name, conn, if_exists='replace', index=False)
+            if key_columns:
+                _ensure_key_index(conn, table_name, key_columns)
+            _save_stats(conn, table_name, len(df), _frame_stats(df))
+            build_approx(conn, table_name, df)
+            conn.commit()
+            return {"mode": mode, "inserted": len(df), "updated": 0, "row_count": len(df)}
+
+        if set(df.columns) != set(existing_columns):
+            raise ValueError(
+                f"Uploaded columns {sorted(df.columns)} do not match table '{table_name}' columns {sorted(existing_columns)}"
+            )
+        df = df[existing_columns]
+
+        row_count, current = _load_stats(conn, table_name)
+        if row_count is None:
+            # Tables created before statistics existed are summarised once
+            row_count, current = _scan_stats(conn, table_name)
+
+        removed = {}
+        removed_rows = 0
+        updated = 0
+        if mode == 'upsert':
+            if not key_columns:
+                raise ValueError("Upsert mode requires at least one key column")
+            missing = [k for k in key_columns if k not in existing_columns]
+            if missing:
+                raise ValueError(f"Key columns not found in table '{table_name}': {missing}")
+
+            df = df.drop_duplicates(subset=key_columns, keep='last')
+            _ensure_key_index(conn, table_name, key_columns)
+            df[key_columns].to_sql(STAGING_TABLE, conn, if_exists='replace', index=False)
+
+            # IS matches NULL keys to each other, the same way drop_duplicates treats NaN
+            join_on = " AND ".join(f's."{k}" IS t."{k}"' for k in key_columns)
+            matched = f'SELECT t.rowid FROM {STAGING_TABLE} s JOIN "{table_name}" t ON {join_on}'
+            old_rows = pd.read_sql_query(
+                f'SELECT t.* FROM {STAGING_TABLE} s JOIN "{table_name}" t ON {join_on}', conn
+            )
+            conn.execute(f'DELETE FROM "{table_name}" WHERE rowid IN ({matched})')
+            remove_sample_rows(conn, table_name, STAGING_TABLE, key_columns)
+            conn.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+            removed = _frame_stats(old_rows)
+            removed_rows = len(old_rows)
+            # Earlier appends may have left several rows per key; count each matched key once
+            updated = len(old_rows[key_columns].drop_duplicates())
+
+        df.to_sql(table_name, conn, if_exists='append', index=False)
+        row_count = row_count + len(df) - removed_rows
+        extend_approx(conn, table_name, df, row_count)
+        _save_stats(conn, table_name, row_count, _apply_delta_stats(current, _frame_stats(df), removed))
+        conn.commit()
+        return {"mode": mode, "inserted": len(df) - updated, "updated": updated, "row_count": row_count}
+    finally:
+        conn.close()
+
+def _ensure_key_index(conn, table_name, key_columns):
+    """
+    Index the upsert key so delta lookups avoid full table scans.
+    """
+    index_name = f"_idx_{table_name}_" + "_".join(key_columns)
+    cols = ", ".join(f'"{k}"' for k in key_columns)
+    conn.execute(f'CREATE INDEX IF NOT EXISTS "{index_name}" ON "{table_name}" ({cols})')
@@ -0,0 +1,112 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+import pytest
+
+import approx
+
+@pytest.fixture
+def seeded(monkeypatch):
+    monkeypatch.setattr(approx, "_rng", np.random.default_rng(7))
+    monkeypatch.setattr(approx, "SAMPLE_ROWS", 20_000)
+    monkeypatch.setattr(approx, "APPROX_MIN_ROWS", 100_000)
+
+def make_sales(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Order_ID": np.arange(rows),
+        "City": np.array(["Delhi", "Mumbai", "Goa"])[rng.choice(3, rows, p=[0.7, 0.295, 0.005])],
+        "Price": rng.integers(100, 10_000, rows).astype(float),
+        "Quantity": rng.integers(1, 6, rows),
+        "Product": np.char.add("P", rng.integers(0, 2_000, rows).astype(str)),
+    })
+
+def write_sales(db_path, df):
+    conn = sqlite3.connect(db_path)
+    df.to_sql("sales", conn, index=False)
+    conn.execute("CREATE TABLE _table_stats (table_name TEXT PRIMARY KEY, row_count INTEGER NOT NULL)")
+    conn.execute("INSERT INTO _table_stats VALUES ('sales', ?)", (len(df),))
+    approx.build_approx(conn, "sales", df)
+    conn.commit()
+    return conn
+
+@pytest.mark.parametrize("sql", [
+    "SELECT COUNT(*) FROM sales",
+    "SELECT City, SUM(Price) AS total FROM sales WHERE Quantity > 2 GROUP BY City",
+    "SELECT City, AVG(Price) FROM sales GROUP BY City ORDER BY AVG(Price) DESC LIMIT 100",
+    "SELECT COUNT(DISTINCT City) FROM sales",
+])
+def test_plan_accepts_aggregates(sql):
+    assert approx._plan(sql, None) is not None
+
+@pytest.mark.parametrize("sql", [
+    "SELECT SUM(Price)/COUNT(*) FROM sales",
+    "SELECT MAX(Price) FROM sales",
+    "SELECT City, Product FROM sales",
+    "SELECT s.City, COUNT(*) FROM sales s JOIN cities c ON s.City = c.name GROUP BY s.City",
+    "SELECT City, COUNT(*) FROM sales GROUP BY City HAVING COUNT(*) > 5",
+    "SELECT COUNT(DISTINCT City) FROM sales WHERE Price > 10",
+])
+def test_plan_rejects_unsupported(sql):
+    assert approx._plan(sql, None) is None
+
+def test_estimates_within_bounds(tmp_path, seeded):
+    df = make_sales(200_000)
+    conn = write_sales(tmp_path / "database.db", df)
+    sql = "SELECT City, COUNT(*) AS n, SUM(Price) AS total, AVG(Price) AS avg_price FROM sales WHERE Quantity > 2 GROUP BY City"
+
+    result, bounds = approx.approximate_query(sql, db_path=tmp_path / "database.db")
+    exact = pd.read_sql_query(sql, conn)
+    conn.close()
+
+    # Rows come back in the same group order as SQLite's
+    assert result["City"].tolist() == exact["City"].tolist()
+    for col in ("n", "total", "avg_price"):
+        assert (abs(result[col] - exact[col]) <= bounds[col]).all(), col
+
+def test_top_n_by_aggregate_falls_back(tmp_path, seeded):
+    conn = write_sales(tmp_path / "database.db", make_sales(200_000))
+    conn.close()
+    sql = "SELECT City, COUNT(*) FROM sales GROUP BY City ORDER BY COUNT(*) DESC LIMIT 2"
+    assert approx.approximate_query(sql, db_path=tmp_path / "database.db") is None
+
+@pytest.mark.parametrize("sql", [
+    # Goa is ~0.5% of rows and P17 one of 2000 products, so almost nothing in the sample matches
+    "SELECT COUNT(*), SUM(Price) FROM sales WHERE Product = 'P17' AND City = 'Goa'",
+    # Product is not the stratum column, so each of its groups gets only a few sampled rows
+    "SELECT Product, AVG(Price) FROM sales GROUP BY Product",
+])
+def test_thin_support_falls_back(tmp_path, seeded, sql):
+    conn = write_sales(tmp_path / "database.db", make_sales(200_000))
+    conn.close()
+    assert approx.approximate_query(sql, db_path=tmp_path / "database.db") is None
+
+def test_bounds_carry_group_labels(tmp_path, seeded):
+    conn = write_sales(tmp_path / "database.db", make_sales(200_000))
+    conn.close()
+    sql = "SELECT City, SUM(Price) AS total FROM sales GROUP BY City"
+    result, bounds = approx.approximate_query(sql, db_path=tmp_path / "database.db")
+    assert bounds["City"].tolist() == result["City"].tolist()
+
+def test_thin_sample_keeps_weights_unbiased(tmp_path, seeded):
+    df = make_sales(200_000)
+    conn = write_sales(tmp_path / "database.db", df)
+    # Three copies at ~10% put ~60k rows in the sample, past 2 * SAMPLE_ROWS, so the last append thins it
+    for _ in range(2):
+        approx.extend_approx(conn, "sales", df, len(df))
+
+    sample = pd.read_sql_query('SELECT City, _weight FROM "_sample_sales"', conn)
+    conn.close()
+    assert len(sample) <= 2 * approx.SAMPLE_ROWS
+    # Three copies of df went in, so each stratum's weights should sum to three times its size
+    expected = df["City"].value_counts() * 3
+    estimated = sample.groupby("City")["_weight"].sum()
+    assert np.allclose(estimated[expected.index], expected, rtol=0.05)
+
+def test_hll_ignores_int_float_drift():
+    ints = pd.Series(np.arange(5000))
+    floats = ints.astype(float)
+    assert np.array_equal(approx._hll_registers(ints), approx._hll_registers(floats))
+
+    merged = np.maximum(approx._hll_registers(ints), approx._hll_registers(floats))
+    assert abs(approx._hll_estimate(merged) - 5000) < 5000 * 0.05
@@ -0,0 +1,106 @@
+import sqlite3
+from collections import OrderedDict
+import pytest
+
+import sql_cache
+
+CITY_SQL = "SELECT SUM(Price) FROM sales WHERE City = 'Delhi'"
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(sql_cache, "_templates", OrderedDict())
+    monkeypatch.setattr(sql_cache, "_values", {})
+    monkeypatch.setattr(sql_cache, "_stats", {"hits": 0, "misses": 0, "stored": 0})
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "database.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE sales (City TEXT, Price REAL)")
+    conn.executemany("INSERT INTO sales VALUES (?, ?)", [("Delhi", 10.0), ("Mumbai", 20.0), ("GOA", 30.0)])
+    conn.commit()
+    conn.close()
+    return path
+
+def test_numbers_are_lifted_and_rebound():
+    assert sql_cache.store_template("orders with price above 100", "SELECT * FROM sales WHERE Price > 100")
+
+    assert sql_cache.match_template("Orders with  price above 250.5") == ("SELECT * FROM sales WHERE Price > ?", [250.5])
+    assert sql_cache.match_template("orders with quantity above 250") is None
+    assert sql_cache.get_template_stats()["hit_rate"] == 0.5
+
+@pytest.mark.parametrize("question, sql", [
+    # The same literal appears twice in the question
+    ("price 100 or quantity 100", "SELECT * FROM sales WHERE Price > 100 OR Quantity > 100"),
+    # String literals that are not exact comparisons cannot be looked up
+    ("cities after Goa", "SELECT * FROM sales WHERE City > 'Goa'"),
+    ("sales in Goa by store", "SELECT * FROM sales s JOIN stores t ON s.Store = t.id WHERE t.City = 'Goa'"),
+    # The question's spelling maps to the literal in no simple case style
+    ("sales in goa", "SELECT * FROM sales WHERE City = 'gOa'"),
+])
+def test_ambiguous_questions_are_not_cached(question, sql):
+    assert not sql_cache.store_template(question, sql)
+    assert sql_cache.get_template_stats()["templates"] == 0
+
+def test_limit_stays_inline_when_literal_is_shared():
+    sql = "SELECT * FROM sales WHERE Price > 100 LIMIT 100"
+    assert sql_cache.store_template("orders with price above 100", sql)
+
+    assert sql_cache.match_template("orders with price above 250") == (
+        "SELECT * FROM sales WHERE Price > ? LIMIT 100", [250]
+    )
+
+def test_string_slots_use_stored_spelling(db_path):
+    assert sql_cache.store_template("total sales in delhi", CITY_SQL)
+
+    param_sql = "SELECT SUM(Price) FROM sales WHERE City = ?"
+    assert sql_cache.match_template("total sales in MUMBAI", db_path) == (param_sql, ["Mumbai"])
+    assert sql_cache.match_template("total sales in goa", db_path) == (param_sql, ["GOA"])
+    assert sql_cache.match_template("total sales in Pune", db_path) is None
+
+def test_numbers_rejected_in_string_slots(db_path):
+    assert sql_cache.store_template("total sales in delhi", CITY_SQL)
+    assert sql_cache.match_template("total sales in 2023", db_path) is None
+
+def test_column_values_are_cached_until_invalidated(db_path):
+    assert sql_cache.store_template("total sales in delhi", CITY_SQL)
+    assert sql_cache.match_template("total sales in pune", db_path) is None
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO sales VALUES ('Pune', 5.0)")
+    conn.commit()
+    conn.close()
+
+    # The distinct values were read once, so the new city is unknown until the table's values are dropped
+    assert sql_cache.match_template("total sales in pune", db_path) is None
+    sql_cache.invalidate_values("sales")
+    assert sql_cache.match_template("total sales in pune", db_path)[1] == ["Pune"]
+
+def test_wide_columns_miss(db_path, monkeypatch):
+    monkeypatch.setattr(sql_cache, "MAX_LOOKUP_VALUES", 2)
+    assert sql_cache.store_template("total sales in delhi", CITY_SQL)
+    assert sql_cache.match_template("total sales in mumbai", db_path) is None
+
+def test_least_recently_used_template_is_evicted(monkeypatch):
+    monkeypatch.setattr(sql_cache, "MAX_TEMPLATES", 2)
+    sql_cache.store_template("orders above 100", "SELECT * FROM sales WHERE Price > 100")
+    sql_cache.store_template("orders below 100", "SELECT * FROM sales WHERE Price < 100")
+
+    # Using the first template makes the second the oldest
+    assert sql_cache.match_template("orders above 5") is not None
+    sql_cache.store_template("orders equal to 100", "SELECT * FROM sales WHERE Price = 100")
+
+    assert sql_cache.match_template("orders below 5") is None
+    assert sql_cache.match_template("orders above 5") is not None
+    assert sql_cache.match_template("orders equal to 5") is not None
+
+def test_invalidate_table_drops_its_templates(db_path):
+    sql_cache.store_template("total sales in delhi", CITY_SQL)
+    sql_cache.store_template("stores with 10 staff", "SELECT * FROM stores WHERE Staff = 10")
+    sql_cache.match_template("total sales in mumbai", db_path)
+
+    sql_cache.invalidate_table("sales")
+    assert sql_cache.get_template_stats()["templates"] == 1
+    assert sql_cache._values == {}
+    assert sql_cache.match_template("total sales in mumbai", db_path) is None
+    assert sql_cache.match_template("stores with 12 staff") is not None
@@ -0,0 +1,109 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+import pytest
+
+import storage
+
+def make_orders(ids, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Order_ID": ids,
+        "City": np.array(["Delhi", "Mumbai", None], dtype=object)[rng.integers(0, 3, len(ids))],
+        "Price": rng.integers(100, 1_000, len(ids)).astype(float),
+    })
+
+def assert_stats_match_table(db_path, table_name="sales"):
+    """
+    Maintained statistics must equal a fresh aggregate over the table.
+    """
+    conn = sqlite3.connect(db_path)
+    row_count, columns = storage._load_stats(conn, table_name)
+    exact_rows = conn.execute(f'SELECT COUNT(*) FROM "{table_name}"').fetchone()[0]
+    exact = {
+        col: conn.execute(f'SELECT COUNT("{col}"), SUM("{col}") FROM "{table_name}"').fetchone()
+        for col in columns
+    }
+    conn.close()
+
+    assert row_count == exact_rows
+    assert columns["Order_ID"][0] == exact["Order_ID"][0]
+    assert columns["City"][0] == exact["City"][0]
+    assert columns["Price"][0] == exact["Price"][0]
+    assert columns["Price"][1] == pytest.approx(exact["Price"][1])
+    assert columns["City"][1] is None
+    return row_count
+
+def read_sales(db_path):
+    conn = sqlite3.connect(db_path)
+    df = pd.read_sql_query('SELECT * FROM sales', conn)
+    conn.close()
+    return df
+
+def test_replace_then_append(tmp_path):
+    db_path = tmp_path / "database.db"
+    summary = storage.write_table(make_orders(range(50)), mode='replace', db_path=db_path)
+    assert summary == {"mode": "replace", "inserted": 50, "updated": 0, "row_count": 50}
+
+    summary = storage.write_table(make_orders(range(50, 80), seed=1), mode='append', db_path=db_path)
+    assert summary == {"mode": "append", "inserted": 30, "updated": 0, "row_count": 80}
+    assert assert_stats_match_table(db_path) == 80
+
+    # Replace discards the previous rows and their statistics
+    storage.write_table(make_orders(range(10), seed=2), mode='replace', db_path=db_path)
+    assert assert_stats_match_table(db_path) == 10
+
+def test_upsert_updates_and_inserts(tmp_path):
+    db_path = tmp_path / "database.db"
+    storage.write_table(make_orders(range(50)), db_path=db_path)
+
+    delta = make_orders(range(40, 60), seed=3)
+    summary = storage.write_table(delta, mode='upsert', key_columns=["Order_ID"], db_path=db_path)
+    assert summary == {"mode": "upsert", "inserted": 10, "updated": 10, "row_count": 60}
+    assert assert_stats_match_table(db_path) == 60
+
+    stored = read_sales(db_path).set_index("Order_ID")
+    assert stored.loc[40:59, "Price"].tolist() == delta["Price"].tolist()
+
+def test_upsert_collapses_duplicate_keys(tmp_path):
+    db_path = tmp_path / "database.db"
+    storage.write_table(make_orders(range(10)), db_path=db_path)
+    # An append can leave two rows per key; one upsert replaces both
+    storage.write_table(make_orders([3, 4], seed=1), mode='append', db_path=db_path)
+
+    delta = pd.DataFrame({"Order_ID": [3, 3, 11], "City": ["Goa", "Pune", "Goa"], "Price": [1.0, 2.0, 3.0]})
+    summary = storage.write_table(delta, mode='upsert', key_columns=["Order_ID"], db_path=db_path)
+    assert summary == {"mode": "upsert", "inserted": 1, "updated": 1, "row_count": 12}
+    assert assert_stats_match_table(db_path) == 12
+
+    stored = read_sales(db_path)
+    # The last duplicate in the upload wins
+    assert stored.loc[stored["Order_ID"] == 3, "City"].tolist() == ["Pune"]
+
+def test_upsert_matches_null_keys(tmp_path):
+    db_path = tmp_path / "database.db"
+    base = pd.DataFrame({"Order_ID": [1, 2, 3], "City": ["Delhi", None, "Goa"], "Price": [10.0, 20.0, 30.0]})
+    storage.write_table(base, db_path=db_path)
+
+    delta = pd.DataFrame({"Order_ID": [9, 4], "City": [None, "Pune"], "Price": [99.0, 40.0]})
+    summary = storage.write_table(delta, mode='upsert', key_columns=["City"], db_path=db_path)
+    assert summary == {"mode": "upsert", "inserted": 1, "updated": 1, "row_count": 4}
+    assert assert_stats_match_table(db_path) == 4
+
+    stored = read_sales(db_path)
+    assert stored.loc[stored["City"].isna(), "Order_ID"].tolist() == [9]
+
+def test_upsert_rejects_mismatched_columns(tmp_path):
+    db_path = tmp_path / "database.db"
+    storage.write_table(make_orders(range(5)), db_path=db_path)
+    with pytest.raises(ValueError):
+        storage.write_table(pd.DataFrame({"Order_ID": [1]}), mode='upsert', key_columns=["Order_ID"], db_path=db_path)
+
+def test_tables_without_stats_are_scanned_once(tmp_path):
+    db_path = tmp_path / "database.db"
+    conn = sqlite3.connect(db_path)
+    make_orders(range(20)).to_sql("sales", conn, index=False)
+    conn.close()
+
+    storage.write_table(make_orders(range(20, 25), seed=1), mode='append', db_path=db_path)
+    assert assert_stats_match_table(db_path) == 25